@@ -2,7 +2,16 @@
 Core functionality for the Interview Assistant.
 """
 
-from .resume_parser import ResumeParser
-from .question_generator import QuestionGenerator
+__all__ = ["ResumeParser", "QuestionGenerator"]
 
-__all__ = ["ResumeParser", "QuestionGenerator"] 
\ No newline at end of file
+
+def __getattr__(name: str) -> type:
+    # Import each class on first use; the question generator loads the OpenAI
+    # SDK, which the resume parser alone doesn't need
+    if name == "ResumeParser":
+        from .resume_parser import ResumeParser
+        return ResumeParser
+    if name == "QuestionGenerator":
+        from .question_generator import QuestionGenerator
+        return QuestionGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
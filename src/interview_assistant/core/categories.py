@@ -0,0 +1,9 @@
+"""
+Question categories offered by the app
+
+Kept apart from question_generator so the UI can list them without loading
+the OpenAI SDK.
+"""
+
+QUESTION_CATEGORIES = ("Technical Skills", "Experience & Projects", "Problem Solving", "Behavioral", "Coding Test")
+DEFAULT_CATEGORIES = ("Technical Skills",)
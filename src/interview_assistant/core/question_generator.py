@@ -4,22 +4,266 @@ Uses OpenAI API to generate interview questions based on resume content
 """
 
 import openai
+import numpy as np
 import streamlit as st
-from typing import List, Dict
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Generator, Iterator, List, Dict, Optional, Tuple, TypeVar
+import asyncio
+import hashlib
+import importlib
+import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from contextlib import asynccontextmanager
+from types import ModuleType
+from .categories import QUESTION_CATEGORIES, DEFAULT_CATEGORIES
+
+tiktoken: Optional[ModuleType]
+try:
+    tiktoken = importlib.import_module("tiktoken")
+except ImportError:  # optional (the tokens extra); resumes are then truncated by a character budget
+    tiktoken = None
+
+_T = TypeVar("_T")
+
+# How long a cached LLM response stays valid (7 days), and how many are kept
+CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+CACHE_MAX_ENTRIES = 32
+
+# Semantic cache: resumes whose embeddings are this similar share a response
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+
+# Completion requests allowed in flight at once, and how rate-limited or failed
+# requests are retried: up to LLM_MAX_RETRIES more attempts, backing off
+# exponentially. The clients are built with max_retries=0, so these are the only
+# retries rather than stacking on the SDK's own.
+LLM_MAX_ASYNC = int(os.getenv("LLM_MAX_ASYNC", "4"))
+LLM_MAX_RETRIES = 3
+LLM_RETRY_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+# Resume text sent to the model. Roughly the old 5000-character slice, but cut
+# on a token boundary when tiktoken is available.
+MAX_RESUME_TOKENS = 1500
+CHARS_PER_TOKEN = 4
+
+# Output budget: insights and ATS suggestions (a little JSON overhead when only
+# questions are requested) plus a share per question.
+# Coding questions carry a problem statement and test cases, so they get more.
+RESPONSE_BASE_TOKENS = 600
+QUESTIONS_ONLY_BASE_TOKENS = 100
+TOKENS_PER_QUESTION = 150
+CODING_TEST_EXTRA_TOKENS = 600
+
+SYSTEM_PROMPT = (
+    "You are an expert interviewer who creates relevant and insightful interview "
+    "questions based on candidate resumes. You are also expert in python, pyspark, "
+    "java, c++, c, javascript, html, css, sql databases, nosql databases, data "
+    "structures, data modeling, algorithms, system design, microservices, distributed"
+    " systems, cloud computing, artificial intelligence, machine learning, deep "
+    "learning, natural language processing, computer vision, robotics, and other "
+    "related technologies. You are also expert in data analysis, data visualization, "
+    "data engineering, data science, data warehousing, data modeling, data cleaning, "
+    "data integration, data transformation, data loading, data unloading, data "
+    "archiving, data backup, data recovery, data replication, data synchronization, "
+    "data migration, REST APIs, CICD pipelines, and other related technologies."
+)
+
+# Task instructions shared by every request, sent right after SYSTEM_PROMPT.
+# Must not interpolate anything, so the text stays byte-identical across calls
+# and OpenAI's automatic prompt caching can reuse it.
+TASK_PROMPT = """Given a resume, perform ALL of the following tasks:
+
+1. Extract these key insights:
+    - technologies (skills, tools, programming languages, frameworks)
+    - companies (with durations, e.g., company name and years/months worked)
+    - total_years_experience (if possible)
+    - education (degree, institution, graduation year)
+    - certifications (if any)
+    - major_projects (if any)
+2. Generate relevant interview questions for a technical role, using the requested
+   question count, difficulty levels and categories given with the resume. Make
+   questions specific to the candidate's background and experience.
+3. Provide 3 actionable suggestions to make this resume more ATS (Applicant Tracking
+   System) friendly. Focus on missing keywords, formatting, clarity, and completeness.
+
+Return your answer in the following JSON structure:
+{
+    "questions": [
+        {"category": "...", "difficulty": "...", "question": "..."},
+        ...
+    ],
+    "insights": {
+        "technologies": [...],
+        "companies": [{"name": "...", "duration": "..."}],
+        "total_years_experience": ...,
+        "education": [{"degree": "...", "institution": "...", "year": "..."}],
+        "certifications": [...],
+        "major_projects": [...]
+    },
+    "ats_suggestions": ["...", "...", "..."]
+}
+
+CRITICAL RULES:
+- Return ONLY the JSON object, no explanations or markdown.
+- For questions, use the specified categories and difficulty levels.
+- For insights, fill as much as possible from the resume.
+- For ATS suggestions, be specific and actionable."""
+
+# Optional additions to the per-request prompt
+CODING_TEST_PROMPT = (
+    "\n\nAdditionally, generate up to 2 LeetCode-style coding questions in Python for the 'Coding Test' category. "
+    "Each coding question should include: a clear problem statement, input/output format, at least 2 sample test cases, and difficulty based on the selected level. "
+    "Format the coding questions with a markdown code block for the function signature and test cases."
+)
+QUESTIONS_ONLY_PROMPT = '\n\nOnly do task 2. Return {"questions": [...]} without "insights" or "ats_suggestions".'
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str) -> Optional[Any]:
+    """Tokenizer for the model, or None if tiktoken or its encoding files are unavailable"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Encodings are downloaded on first use, which fails offline
+        return None
+
+
+@lru_cache(maxsize=64)
+def _format_example(categories: Tuple[str, ...]) -> str:
+    """Format example for the given categories; pure, so memoized per category tuple"""
+    return "\n\n".join(
+        f"{category.upper()}:\n1. [EASY] [Question text]\n2. [MEDIUM] [Question text]\n3. [HARD] [Question text]"
+        for category in categories
+    )
+
+
+# Warm the cache for the default selection and for every category
+_format_example(DEFAULT_CATEGORIES)
+_format_example(QUESTION_CATEGORIES)
+
+
+class _QuestionStreamParser:
+    """Pull complete question objects out of a streamed JSON response as it arrives"""
+    
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = -1
+        self._last_key = ""
+        self._array_depth = 0
+        self._object_start = -1
+    
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Add the next chunk of response text
+        
+        Returns:
+            List[Dict]: Question objects completed by this chunk
+        """
+        self._buffer += chunk
+        completed = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = buffer[self._string_start + 1:i]
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._last_key == "questions":
+                    self._array_depth = self._depth + 1
+                elif char == "{" and self._array_depth and self._depth == self._array_depth:
+                    self._object_start = i
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._array_depth and self._depth == self._array_depth and self._object_start >= 0:
+                    try:
+                        question = json.loads(buffer[self._object_start:i + 1])
+                    except json.JSONDecodeError:
+                        question = None
+                    if isinstance(question, dict):
+                        completed.append(question)
+                    self._object_start = -1
+                elif self._depth < self._array_depth:
+                    self._array_depth = 0
+        self._pos = len(buffer)
+        return completed
+
 
 class QuestionGenerator:
     """Class to generate interview questions using OpenAI API"""
     
-    def __init__(self):
+    # Raw LLM responses keyed by request fingerprint. Kept on the class so the
+    # cache survives Streamlit reruns, which build a new generator per click.
+    # Sessions share it from several threads, so every access holds the lock.
+    _cache: Dict[str, Tuple[float, str]] = {}
+    _cache_lock = threading.Lock()
+    
+    # L2-normalized resume embeddings (one row per entry) and, row for row,
+    # the (timestamp, filter signature, questions-only response) each one produced.
+    # Always replaced as one tuple under the lock, so rows and entries never drift apart.
+    _semantic_index: Tuple[Optional[np.ndarray], List[Tuple[float, tuple, str]]] = (None, [])
+    _semantic_lock = threading.Lock()
+    
+    # Resume embeddings keyed by resume hash, so the per-category requests of one
+    # click (and later clicks) embed the resume once
+    _embeddings: Dict[str, np.ndarray] = {}
+    
+    # Requests currently being produced, so identical concurrent requests (reruns,
+    # several tabs) wait for the same OpenAI call instead of issuing their own.
+    # Responses and resume embeddings are coalesced in separate registries.
+    _inflight: Dict[str, "Future[str]"] = {}
+    _embedding_inflight: Dict[str, "Future[Optional[np.ndarray]]"] = {}
+    _inflight_lock = threading.Lock()
+    
+    # Cap on concurrent completion requests across all generators, shared by
+    # threads and by async callers on every event loop
+    _llm_slots = threading.BoundedSemaphore(LLM_MAX_ASYNC)
+    
+    def __init__(self) -> None:
         """Initialize OpenAI client with API key"""
+        if not os.getenv("OPENAI_API_KEY"):
+            # Only read .env when the environment doesn't already provide the key
+            load_dotenv()
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             st.error("OpenAI API key not found. Please set OPENAI_API_KEY in your environment variables.")
             st.stop()
         
-        self.client = openai.OpenAI(api_key=api_key)
-        self.model = os.getenv("OPENAI_MODEL", "gpt-4-1106-preview")
+        self.client = openai.OpenAI(api_key=api_key, max_retries=0)
+        # An AsyncOpenAI connection pool belongs to the event loop it was first used
+        # on, and every asyncio.run starts a new loop, so by default each loop gets
+        # its own client (with a count of its users), closed when the last user is
+        # done. Setting aclient pins a single client instead.
+        self.aclient: Optional[openai.AsyncOpenAI] = None
+        self._api_key = api_key
+        self._aclients: Dict[asyncio.AbstractEventLoop, Tuple[openai.AsyncOpenAI, int]] = {}
+        self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self.temperature = 0.7
+        self.semantic_cache = os.getenv("QG_SEMANTIC_CACHE", "1") == "1"
+        self.semantic_threshold = float(os.getenv("QG_SEMANTIC_THRESHOLD", "0.95"))
     
     def generate_questions(self, resume_text: str, 
                                 question_count: int = 10, 
@@ -43,26 +287,7 @@ class QuestionGenerator:
                 question_count = 10
                 st.warning("Question count limited to maximum of 10")
             
-            # Create the prompt for question generation
-            prompt = self._create_question_prompt(resume_text, question_count, difficulty_filter, category_filter)
-            
-
-            # Generate questions using OpenAI
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert interviewer who creates relevant and insightful interview questions based on candidate resumes. You are also expert in python, pyspark, java, c++, c, javascript, html, css, sql databases, nosql databases, data structures, data modeling, algorithms, system design, microservices, distributed systems, cloud computing, artificial intelligence, machine learning, deep learning, natural language processing, computer vision, robotics, and other related technologies. You are also expert in data analysis, data visualization, data engineering, data science, data warehousing, data modeling, data cleaning, data integration, data transformation, data loading, data unloading, data archiving, data backup, data recovery, data replication, data synchronization, data migration, REST APIs, CICD pipelines, and other related technologies."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            
-            # Parse the response
-            questions_text = response.choices[0].message.content
-
-            
-            questions = self._parse_questions(questions_text)
+            questions = list(self.generate_questions_stream(resume_text, question_count, difficulty_filter, category_filter))
             # Validate that we got the expected number of questions
             if len(questions) != question_count:
                 st.warning(f"Generated {len(questions)} questions instead of requested {question_count}.\
@@ -75,160 +300,708 @@ class QuestionGenerator:
             st.error("Please check your OpenAI API key and try again.")
             return []
     
-    def _create_question_prompt(self, resume_text: str, question_count: int, difficulty_filter: list, category_filter: list) -> str:
-            """
-            Create a detailed prompt for question generation, key insights extraction, and ATS suggestions
-    
-            Args:
-                    resume_text: Resume content
-                    question_count: Number of questions to generate
-                    difficulty_filter: List of difficulty levels
-                    category_filter: List of categories
-        
-            Returns:
-                    str: Formatted prompt for OpenAI
-            """
-            return f"""
-            Given the following resume, perform ALL of the following tasks:
-    
-            1. Extract and return these key insights in JSON:
-                    - technologies (skills, tools, programming languages, frameworks)
-                    - companies (with durations, e.g., company name and years/months worked)
-                    - total_years_experience (if possible)
-                    - education (degree, institution, graduation year)
-                    - certifications (if any)
-                    - major_projects (if any)
-            2. Generate exactly {question_count} relevant interview questions for a technical role, using:
-                    - Difficulty levels: {', '.join(difficulty_filter)}
-                    - Categories: {', '.join(category_filter)}
-                    - Make questions specific to the candidate's background and experience
-                    - Use this format with category headers:
-            {self._get_format_example(category_filter)}
-            3. Provide 3 actionable suggestions to make this resume more ATS (Applicant Tracking System) friendly. Focus on missing keywords, formatting, clarity, and completeness.
-    
-            Resume Content:
-            {resume_text[:5000]}
-    
-            Return your answer in the following JSON structure:
-            {{
-                "insights": {{
-                    "technologies": [...],
-                    "companies": [{{"name": "...", "duration": "..."}}],
-                    "total_years_experience": ...,
-                    "education": [{{"degree": "...", "institution": "...", "year": "..."}}],
-                    "certifications": [...],
-                    "major_projects": [...]
-                }},
-                "questions": [
-                    {{"category": "...", "difficulty": "...", "question": "..."}},
-                    ...
-                ],
-                "ats_suggestions": ["...", "...", "..."]
-            }}
-    
-            CRITICAL RULES:
-            - Return ONLY the JSON object, no explanations or markdown.
-            - For questions, use the specified categories and difficulty levels.
-            - For insights, fill as much as possible from the resume.
-            - For ATS suggestions, be specific and actionable.
-            """
-
-    def _get_format_example(self, categories: list) -> str:
-        """Get format example based on selected categories"""
-        examples = []
-        for category in categories:
-            examples.append(f"{category.upper()}:\n1. [EASY] [Question text]\n2. [MEDIUM] [Question text]\n3. [HARD] [Question text]")
-        return "\n\n".join(examples)
-    
-    def _parse_questions(self, llm_response: str) -> List[Dict]:
+    def generate_response(self, resume_text: str,
+                          question_count: int = 10,
+                          difficulty_filter: list = ["Easy"],
+                          category_filter: list = ["Technical Skills"]) -> str:
         """
-        Parse the questions from the LLM's JSON response.
+        Get the raw JSON response (questions, insights and ATS suggestions) for a resume.
+        Identical requests are answered from the response cache without calling OpenAI,
+        and near-identical resumes (e.g. reformatted) from the semantic cache, which
+        reuses only their questions: insights and ATS suggestions are left empty.
+        
         Args:
-            llm_response: Raw text from OpenAI response (expected to be JSON)
+            resume_text: Extracted text from resume
+            question_count: Number of questions to generate
+            difficulty_filter: List of difficulty levels to include
+            category_filter: List of categories to include
+            
         Returns:
-            List[Dict]: Structured questions with categories and difficulty levels
+            str: Raw text of the LLM response (expected to be JSON)
         """
-        import json
+        key = self._cache_key(resume_text, question_count, difficulty_filter, category_filter)
+        signature = self._filter_signature(question_count, difficulty_filter, category_filter)
+        future, leader = self._lead_or_wait(QuestionGenerator._inflight, key)
+        if not leader:
+            return future.result()
+        
         try:
-            data = json.loads(llm_response)
-            questions = data.get("questions", [])
-            return questions
+            llm_response, embedding = self._cached_response(key, resume_text, signature)
+            if llm_response is None:
+                # Generate questions using OpenAI
+                response = self._create_completion(
+                    **self._completion_kwargs(resume_text, question_count, difficulty_filter, category_filter)
+                )
+                choice = response.choices[0]
+                llm_response = choice.message.content or ""
+                self._store_response(key, embedding, signature, llm_response, choice.finish_reason)
+            if not future.done():
+                future.set_result(llm_response)
+            return llm_response
         except Exception as e:
-            st.error(f"Failed to parse questions from LLM response: {e}")
-            return []
-
-    def _parse_insights(self, llm_response: str) -> Dict:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            self._finish_inflight(QuestionGenerator._inflight, key, future)
+    
+    async def generate_response_async(self, resume_text: str,
+                                      question_count: int = 10,
+                                      difficulty_filter: list = ["Easy"],
+                                      category_filter: list = ["Technical Skills"],
+                                      questions_only: bool = False) -> str:
         """
-        Parse the key insights from the LLM's JSON response.
+        Async version of generate_response, using the AsyncOpenAI client
+        
         Args:
-            llm_response: Raw text from OpenAI response (expected to be JSON)
+            resume_text: Extracted text from resume
+            question_count: Number of questions to generate
+            difficulty_filter: List of difficulty levels to include
+            category_filter: List of categories to include
+            questions_only: Ask for the questions alone, without insights or ATS suggestions
+            
         Returns:
-            Dict: Extracted insights
+            str: Raw text of the LLM response (expected to be JSON)
         """
-        import json
+        key = self._cache_key(resume_text, question_count, difficulty_filter, category_filter, questions_only)
+        signature = self._filter_signature(question_count, difficulty_filter, category_filter, questions_only)
+        future, leader = await self._lead_or_wait_async(QuestionGenerator._inflight, key)
+        if not leader:
+            return future.result()
+        
         try:
-            data = json.loads(llm_response)
-            insights = data.get("insights", {})
-            return insights
+            # The semantic lookup makes a blocking embeddings call; keep it off the event loop
+            llm_response, embedding = await asyncio.to_thread(self._cached_response, key, resume_text, signature)
+            if llm_response is None:
+                response = await self._acreate_completion(
+                    **self._completion_kwargs(resume_text, question_count, difficulty_filter, category_filter, questions_only)
+                )
+                choice = response.choices[0]
+                llm_response = choice.message.content or ""
+                self._store_response(key, embedding, signature, llm_response, choice.finish_reason)
+            if not future.done():
+                future.set_result(llm_response)
+            return llm_response
         except Exception as e:
-            st.error(f"Failed to parse insights from LLM response: {e}")
-            return {}
-
-    def _parse_ats_suggestions(self, llm_response: str) -> List[str]:
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            self._finish_inflight(QuestionGenerator._inflight, key, future)
+    
+    async def generate_many(self, resumes: List[str],
+                            question_count: int = 10,
+                            difficulty_filter: list = ["Easy"],
+                            category_filter: list = ["Technical Skills"],
+                            concurrency: int = 10) -> List[List[Dict]]:
         """
-        Parse the ATS suggestions from the LLM's JSON response.
+        Generate questions for several resumes concurrently
+        
+        Requests run in parallel, at most `concurrency` at a time to stay within rate
+        limits. A failed resume yields an empty list instead of failing the rest.
+        
         Args:
-            llm_response: Raw text from OpenAI response (expected to be JSON)
+            resumes: Extracted text of each resume
+            question_count: Number of questions to generate per resume (max 10)
+            difficulty_filter: List of difficulty levels to include
+            category_filter: List of categories to include
+            concurrency: Maximum number of requests in flight
+            
+        Returns:
+            List[List[Dict]]: Questions for each resume, in input order
+        """
+        question_count = min(question_count, 10)
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _one(resume_text: str) -> List[Dict]:
+            async with semaphore:
+                try:
+                    llm_response = await self.generate_response_async(resume_text, question_count, difficulty_filter, category_filter)
+                except Exception as e:
+                    st.error(f"Error generating questions: {str(e)}")
+                    return []
+            return self._parse_questions(llm_response)
+        
+        # One client serves every resume and is closed once all of them are done
+        async with self._async_client():
+            return list(await asyncio.gather(*(_one(resume_text) for resume_text in resumes)))
+    
+    async def agenerate_questions(self, resume_text: str,
+                                  question_count: int = 10,
+                                  difficulty_filter: list = ["Easy"],
+                                  category_filter: list = ["Technical Skills"],
+                                  on_questions: Optional[Callable[[List[Dict]], None]] = None) -> Dict:
+        """
+        Generate questions for several categories with one concurrent request per category
+        
+        The question count is split across the categories and the smaller requests run
+        in parallel (at most LLM_MAX_ASYNC at a time), so the wait is that of the
+        slowest category rather than one long completion. Each sub-request goes through
+        generate_response_async and so shares its caches.
+        
+        Args:
+            resume_text: Extracted text from resume
+            question_count: Number of questions to generate (max 10)
+            difficulty_filter: List of difficulty levels to include
+            category_filter: List of categories to include
+            on_questions: Called with each category's questions as soon as they arrive,
+                on the event loop's thread, so callers can show them early
+            
+        Returns:
+            Dict: Merged questions, plus insights and ATS suggestions from the first request
+        """
+        question_count = min(question_count, 10)
+        categories = list(dict.fromkeys(category_filter)) or list(DEFAULT_CATEGORIES)
+        # Spread the count as evenly as possible; categories that get none are skipped
+        base, extra = divmod(question_count, len(categories))
+        subtasks = [(category, base + (i < extra)) for i, category in enumerate(categories)]
+        subtasks = [(category, count) for category, count in subtasks if count]
+        
+        async def _one(category: str, count: int, questions_only: bool) -> Dict:
+            llm_response = await self.generate_response_async(resume_text, count, difficulty_filter, [category], questions_only)
+            result = self.parse_response(llm_response)
+            if on_questions is not None:
+                on_questions(result["questions"])
+            return result
+        
+        # Only the first request also extracts insights and ATS suggestions; the
+        # others would produce the same output again just to have it discarded
+        async with self._async_client():
+            results = await asyncio.gather(*(_one(category, count, i > 0) for i, (category, count) in enumerate(subtasks)))
+        merged: Dict[str, Any] = {"questions": [], "insights": {}, "ats_suggestions": []}
+        for result in results:
+            merged["questions"].extend(result["questions"])
+            merged["insights"] = merged["insights"] or result["insights"]
+            merged["ats_suggestions"] = merged["ats_suggestions"] or result["ats_suggestions"]
+        return merged
+    
+    def generate_questions_stream(self, resume_text: str,
+                                  question_count: int = 10,
+                                  difficulty_filter: list = ["Easy"],
+                                  category_filter: list = ["Technical Skills"]) -> Generator[Dict, None, str]:
+        """
+        Stream interview questions as the LLM produces them
+        
+        Each question is yielded as soon as its JSON object is complete, so callers can
+        render the first question while the rest is still being generated. Cached
+        responses are yielded immediately. Once exhausted, the generator returns the full
+        response text (as StopIteration.value), so callers can parse_response it for
+        insights and ATS suggestions without another request.
+        
+        Args:
+            resume_text: Extracted text from resume
+            question_count: Number of questions to generate
+            difficulty_filter: List of difficulty levels to include
+            category_filter: List of categories to include
+            
+        Yields:
+            Dict: Question with category and difficulty level
+            
         Returns:
-            List[str]: List of ATS suggestions
+            str: Raw text of the LLM response (expected to be JSON)
         """
-        import json
+        key = self._cache_key(resume_text, question_count, difficulty_filter, category_filter)
+        signature = self._filter_signature(question_count, difficulty_filter, category_filter)
+        future, leader = self._lead_or_wait(QuestionGenerator._inflight, key)
+        if not leader:
+            llm_response = future.result()
+            yield from self._parse_questions(llm_response)
+            return llm_response
+        
         try:
-            data = json.loads(llm_response)
-            ats_suggestions = data.get("ats_suggestions", [])
-            return ats_suggestions
+            cached, embedding = self._cached_response(key, resume_text, signature)
+            if cached is not None:
+                if not future.done():
+                    future.set_result(cached)
+                yield from self._parse_questions(cached)
+                return cached
+            
+            stream = self._stream_completion(
+                **self._completion_kwargs(resume_text, question_count, difficulty_filter, category_filter)
+            )
+            parser = _QuestionStreamParser()
+            parts = []
+            finish_reason = None
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                # Only the last chunk carries the finish reason
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                delta = chunk.choices[0].delta.content or ""
+                parts.append(delta)
+                yield from parser.feed(delta)
+            
+            llm_response = "".join(parts)
+            self._store_response(key, embedding, signature, llm_response, finish_reason)
+            if not future.done():
+                future.set_result(llm_response)
+            return llm_response
         except Exception as e:
-            st.error(f"Failed to parse ATS suggestions from LLM response: {e}")
-            return []
+            if not future.done():
+                future.set_exception(e)
+            raise
+        finally:
+            self._finish_inflight(QuestionGenerator._inflight, key, future)
     
-    def _extract_difficulty_and_clean(self, question_text: str) -> tuple:
+    def generate_questions_batch(self, resumes: List[str],
+                                 question_count: int = 10,
+                                 difficulty_filter: list = ["Easy"],
+                                 category_filter: list = ["Technical Skills"],
+                                 poll_interval: float = 30.0) -> List[List[Dict]]:
         """
-        Extract difficulty level and clean question text
+        Generate questions for many resumes through the OpenAI Batch API
+        
+        Batch requests cost half as much and do not count against the interactive rate
+        limits, but complete within 24 hours, so this is meant for offline bulk runs.
+        Blocks until the batch finishes. Requires QG_BATCH_MODE=1.
         
         Args:
-            question_text: Question text that may contain difficulty markers
+            resumes: Extracted text of each resume
+            question_count: Number of questions to generate per resume (max 10)
+            difficulty_filter: List of difficulty levels to include
+            category_filter: List of categories to include
+            poll_interval: Seconds to wait between batch status checks
             
         Returns:
-            tuple: (difficulty, clean_question) or (None, None) if invalid
-        """
-        # Check for explicit difficulty markers (case insensitive)
-        question_upper = question_text.upper()
-        
-        if '[EASY]' in question_upper:
-            difficulty = "Easy"
-            clean_question = question_text.replace('[EASY]', '').replace('[easy]', '').strip()
-        elif '[HARD]' in question_upper:
-            difficulty = "Hard"
-            clean_question = question_text.replace('[HARD]', '').replace('[hard]', '').strip()
-        elif '[MEDIUM]' in question_upper:
-            difficulty = "Medium"
-            clean_question = question_text.replace('[MEDIUM]', '').replace('[medium]', '').strip()
-        else:
-            # Try to find difficulty in the text without brackets
-            if 'EASY' in question_upper and question_upper.find('EASY') < 20:  # Within first 20 chars
-                difficulty = "Easy"
-                clean_question = question_text.replace('EASY', '').replace('easy', '').strip()
-            elif 'HARD' in question_upper and question_upper.find('HARD') < 20:
-                difficulty = "Hard"
-                clean_question = question_text.replace('HARD', '').replace('hard', '').strip()
-            elif 'MEDIUM' in question_upper and question_upper.find('MEDIUM') < 20:
-                difficulty = "Medium"
-                clean_question = question_text.replace('MEDIUM', '').replace('medium', '').strip()
+            List[List[Dict]]: Questions for each resume, in input order
+        """
+        if os.getenv("QG_BATCH_MODE") != "1":
+            st.error("Batch mode is disabled. Set QG_BATCH_MODE=1 to enable it.")
+            return []
+        
+        question_count = min(question_count, 10)
+        lines = []
+        for i, resume_text in enumerate(resumes):
+            lines.append(json.dumps({
+                "custom_id": f"resume-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._completion_kwargs(resume_text, question_count, difficulty_filter, category_filter),
+            }))
+        
+        input_file = self.client.files.create(
+            file=("questions_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        if batch.status != "completed" or not batch.output_file_id:
+            st.error(f"Question batch {batch.id} finished with status '{batch.status}'")
+            return []
+        
+        results: List[List[Dict]] = [[] for _ in resumes]
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            index = int(record["custom_id"].split("-", 1)[1])
+            choice = response["body"]["choices"][0]
+            llm_response = choice["message"]["content"]
+            # Later interactive requests for the same resume are served from cache
+            if self._is_complete(llm_response, choice.get("finish_reason")):
+                key = self._cache_key(resumes[index], question_count, difficulty_filter, category_filter)
+                self._cache_put(key, llm_response)
+            results[index] = self._parse_questions(llm_response)
+        return results
+    
+    def _create_completion(self, **kwargs: Any) -> Any:
+        """
+        chat.completions.create, limited to LLM_MAX_ASYNC concurrent calls and retried
+        with exponential backoff and jitter when OpenAI answers 429 or fails transiently
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                with self._llm_slots:
+                    return self.client.chat.completions.create(**kwargs)
+            except LLM_RETRY_ERRORS:
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+            time.sleep(2 ** attempt + random.random())
+    
+    def _stream_completion(self, **kwargs: Any) -> Iterator[Any]:
+        """
+        Streaming version of _create_completion. The request slot is held until the
+        stream is exhausted or closed, not just until the first response arrives.
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            with self._llm_slots:
+                try:
+                    stream = self.client.chat.completions.create(stream=True, **kwargs)
+                except LLM_RETRY_ERRORS:
+                    if attempt == LLM_MAX_RETRIES:
+                        raise
+                else:
+                    with stream:
+                        yield from stream
+                    return
+            time.sleep(2 ** attempt + random.random())
+    
+    async def _acreate_completion(self, **kwargs: Any) -> Any:
+        """Async version of _create_completion, using the AsyncOpenAI client"""
+        async with self._async_client() as client:
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                try:
+                    async with self._async_llm_slot():
+                        return await client.chat.completions.create(**kwargs)
+                except LLM_RETRY_ERRORS:
+                    if attempt == LLM_MAX_RETRIES:
+                        raise
+                await asyncio.sleep(2 ** attempt + random.random())
+    
+    @asynccontextmanager
+    async def _async_client(self) -> AsyncIterator[openai.AsyncOpenAI]:
+        """
+        The AsyncOpenAI client for the running event loop, shared by nested and
+        concurrent users on that loop and closed when the last of them is done
+        """
+        if self.aclient is not None:
+            yield self.aclient
+            return
+        loop = asyncio.get_running_loop()
+        client, users = self._aclients.get(loop) or (openai.AsyncOpenAI(api_key=self._api_key, max_retries=0), 0)
+        self._aclients[loop] = (client, users + 1)
+        try:
+            yield client
+        finally:
+            client, users = self._aclients.pop(loop)
+            if users > 1:
+                self._aclients[loop] = (client, users - 1)
             else:
-                return None, None
+                await client.close()
+    
+    @asynccontextmanager
+    async def _async_llm_slot(self) -> AsyncIterator[None]:
+        """Hold one of the process-wide _llm_slots from async code without blocking the event loop"""
+        slots = self._llm_slots
+        if not slots.acquire(blocking=False):
+            acquiring = asyncio.get_running_loop().run_in_executor(None, slots.acquire)
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                # The worker thread still takes the slot; give it back once it has
+                acquiring.add_done_callback(lambda _: slots.release())
+                raise
+        try:
+            yield
+        finally:
+            slots.release()
+    
+    def _cache_key(self, resume_text: str, question_count: int, difficulty_filter: list, category_filter: list,
+                   questions_only: bool = False) -> str:
+        """Fingerprint every input that changes the LLM response"""
+        payload = json.dumps({
+            "r": resume_text.strip(),
+            "m": self.model,
+            "t": self.temperature,
+            "n": question_count,
+            "d": sorted(difficulty_filter),
+            "c": sorted(category_filter),
+            "q": questions_only,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def _lead_or_wait(self, registry: Dict[str, "Future[_T]"], key: str) -> Tuple["Future[_T]", bool]:
+        """
+        Coalesce identical concurrent requests registered in registry
+        
+        Returns:
+            tuple: (Future to resolve, True) if this caller must produce the response, or
+                (finished Future holding the response, False) once an identical request
+                already in flight has finished
+        """
+        while True:
+            future, leader = self._join_inflight(registry, key)
+            if leader:
+                return future, True
+            try:
+                future.result()
+                return future, False
+            except CancelledError:
+                # The producing stream was abandoned; produce the response here instead
+                continue
+    
+    async def _lead_or_wait_async(self, registry: Dict[str, "Future[_T]"],
+                                  key: str) -> Tuple["Future[_T]", bool]:
+        """Async version of _lead_or_wait"""
+        while True:
+            future, leader = self._join_inflight(registry, key)
+            if leader:
+                return future, True
+            try:
+                # Shielded, so cancelling this waiter does not cancel the shared Future
+                # and with it the leader's request and every other waiter
+                await asyncio.shield(asyncio.wrap_future(future))
+                return future, False
+            except asyncio.CancelledError:
+                # Only an abandoned producer is retried; our own cancellation propagates
+                if not future.cancelled():
+                    raise
+    
+    def _join_inflight(self, registry: Dict[str, "Future[_T]"], key: str) -> Tuple["Future[_T]", bool]:
+        """Register as the producer of key, or get the Future of the request already producing it"""
+        with QuestionGenerator._inflight_lock:
+            future = registry.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            registry[key] = future
+            return future, True
+    
+    def _finish_inflight(self, registry: Dict[str, "Future[_T]"], key: str, future: "Future[_T]") -> None:
+        """Unregister a producer; waiters of an unfinished one are woken with CancelledError"""
+        with QuestionGenerator._inflight_lock:
+            if registry.get(key) is future:
+                del registry[key]
+        if not future.done():
+            future.cancel()
+    
+    def _cached_response(self, key: str, resume_text: str, signature: tuple) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Look a request up in the exact and semantic caches
+        
+        Returns:
+            tuple: (cached response or None, resume embedding to store the new response under)
+        """
+        with QuestionGenerator._cache_lock:
+            cached = self._cache.pop(key, None)
+            if cached and time.time() - cached[0] < CACHE_TTL_SECONDS:
+                # Re-insert so the dict stays in least-recently-used order
+                self._cache[key] = cached
+                return cached[1], None
+        
+        embedding = self._embed_resume(resume_text) if self.semantic_cache else None
+        if embedding is not None:
+            similar = self._semantic_lookup(embedding, signature)
+            if similar is not None:
+                self._cache_put(key, similar)
+                return similar, None
+        return None, embedding
+    
+    def _store_response(self, key: str, embedding: Optional[np.ndarray], signature: tuple, llm_response: str,
+                        finish_reason: Optional[str]) -> None:
+        """Add a fresh LLM response to the exact and semantic caches, unless it is truncated or invalid"""
+        if not self._is_complete(llm_response, finish_reason):
+            # Caching it would hand the same broken response to every retry
+            return
+        self._cache_put(key, llm_response)
+        if embedding is not None:
+            # Insights and ATS suggestions describe this resume alone; a similar
+            # resume from another session may only reuse the questions
+            questions = json.dumps({"questions": self.parse_response(llm_response)["questions"]})
+            self._semantic_store(embedding, signature, questions)
+    
+    @staticmethod
+    def _is_complete(llm_response: Optional[str], finish_reason: Optional[str]) -> bool:
+        """Whether a response finished normally and is valid JSON, and so may be cached"""
+        if finish_reason != "stop" or not llm_response:
+            return False
+        try:
+            json.loads(llm_response)
+        except json.JSONDecodeError:
+            return False
+        return True
+    
+    def _cache_put(self, key: str, llm_response: str) -> None:
+        """Add a response to the exact cache, evicting the least recently used when full"""
+        with QuestionGenerator._cache_lock:
+            self._cache.pop(key, None)
+            self._cache[key] = (time.time(), llm_response)
+            while len(self._cache) > CACHE_MAX_ENTRIES:
+                self._cache.pop(next(iter(self._cache)), None)
+    
+    def _filter_signature(self, question_count: int, difficulty_filter: list, category_filter: list,
+                          questions_only: bool = False) -> tuple:
+        """Everything except the resume that must match for a semantic cache hit"""
+        return (self.model, self.temperature, question_count,
+                tuple(sorted(difficulty_filter)), tuple(sorted(category_filter)), questions_only)
+    
+    def _embed_resume(self, resume_text: str) -> Optional[np.ndarray]:
+        """
+        Embed the resume for the semantic cache
+        
+        Returns:
+            np.ndarray: L2-normalized embedding, or None if embedding failed
+        """
+        text = resume_text[:8000]
+        key = hashlib.sha256(f"{EMBEDDING_MODEL}\n{text}".encode("utf-8")).hexdigest()
+        cached = self._embeddings.pop(key, None)
+        if cached is not None:
+            self._embeddings[key] = cached
+            return cached
+        
+        # Concurrent requests for the same resume wait for one embeddings call
+        future, leader = self._lead_or_wait(QuestionGenerator._embedding_inflight, key)
+        if not leader:
+            return future.result()
+        
+        embedding = None
+        try:
+            response = self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+            vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm:
+                embedding = vector / norm
+                self._embeddings[key] = embedding
+                while len(self._embeddings) > SEMANTIC_CACHE_MAX_ENTRIES:
+                    self._embeddings.pop(next(iter(self._embeddings)), None)
+        except Exception:
+            # The semantic cache is an optimization only; generate as usual
+            pass
+        finally:
+            if not future.done():
+                future.set_result(embedding)
+            self._finish_inflight(QuestionGenerator._embedding_inflight, key, future)
+        return embedding
+    
+    def _semantic_lookup(self, embedding: np.ndarray, signature: tuple) -> Optional[str]:
+        """Return the cached questions (without insights or ATS suggestions) for a similar resume with the same filters, if any"""
+        with QuestionGenerator._semantic_lock:
+            matrix, entries = QuestionGenerator._semantic_index
+        if matrix is None:
+            return None
+        
+        scores = matrix @ embedding
+        now = time.time()
+        for idx in np.argsort(scores)[::-1][:5]:
+            if scores[idx] < self.semantic_threshold:
+                break
+            created, entry_signature, response = entries[int(idx)]
+            if entry_signature == signature and now - created < CACHE_TTL_SECONDS:
+                return response
+        return None
+    
+    def _semantic_store(self, embedding: np.ndarray, signature: tuple, response: str) -> None:
+        """Add a response to the semantic cache, evicting the oldest entries when full"""
+        row = embedding[np.newaxis, :]
+        with QuestionGenerator._semantic_lock:
+            matrix, entries = QuestionGenerator._semantic_index
+            matrix = row if matrix is None else np.vstack([matrix, row])
+            entries = entries + [(time.time(), signature, response)]
+            if len(entries) > SEMANTIC_CACHE_MAX_ENTRIES:
+                matrix = matrix[-SEMANTIC_CACHE_MAX_ENTRIES:]
+                entries = entries[-SEMANTIC_CACHE_MAX_ENTRIES:]
+            QuestionGenerator._semantic_index = (matrix, entries)
+    
+    def _completion_kwargs(self, resume_text: str, question_count: int, difficulty_filter: list, category_filter: list,
+                           questions_only: bool = False) -> Dict:
+        """Request parameters for chat.completions.create, shared by all generation paths"""
+        return {
+            "model": self.model,
+            "messages": self._build_messages(resume_text, question_count, difficulty_filter, category_filter, questions_only),
+            "temperature": self.temperature,
+            "max_tokens": self._max_tokens(question_count, category_filter, questions_only),
+            "response_format": {"type": "json_object"},
+        }
+    
+    def _max_tokens(self, question_count: int, category_filter: list, questions_only: bool = False) -> int:
+        """Output token budget sized to the requested questions instead of a fixed 4000"""
+        base_tokens = QUESTIONS_ONLY_BASE_TOKENS if questions_only else RESPONSE_BASE_TOKENS
+        max_tokens = base_tokens + TOKENS_PER_QUESTION * question_count
+        if "Coding Test" in category_filter:
+            max_tokens += CODING_TEST_EXTRA_TOKENS
+        return max_tokens
+    
+    def _build_messages(self, resume_text: str, question_count: int, difficulty_filter: list, category_filter: list,
+                        questions_only: bool = False) -> List[Dict]:
+        """
+        Build the chat messages for a generation request
+        
+        The system prompt and task instructions never change between calls and are sent
+        first, so OpenAI's automatic prompt caching can reuse them; everything that
+        varies per request follows in a separate message.
         
-        # Clean up extra brackets, whitespace, and normalize
-        clean_question = clean_question.replace('[', '').replace(']', '').strip()
-        clean_question = ' '.join(clean_question.split())  # Normalize multiple spaces
+        Returns:
+            List[Dict]: Messages for chat.completions.create
+        """
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": TASK_PROMPT},
+            {"role": "user", "content": self._create_question_prompt(resume_text, question_count, difficulty_filter, category_filter, questions_only)},
+        ]
+    
+    def _create_question_prompt(self, resume_text: str, question_count: int, difficulty_filter: list, category_filter: list,
+                                questions_only: bool = False) -> str:
+        """
+        Create the per-request part of the prompt: question settings and resume content
         
-        return difficulty, clean_question 
\ No newline at end of file
+        Args:
+            resume_text: Resume content
+            question_count: Number of questions to generate
+            difficulty_filter: List of difficulty levels
+            category_filter: List of categories
+            questions_only: Skip tasks 1 and 3 (insights and ATS suggestions)
+            
+        Returns:
+            str: Formatted prompt for OpenAI
+        """
+        parts = [
+            f"Generate exactly {question_count} interview questions.\n"
+            f"Difficulty levels: {', '.join(difficulty_filter)}\n"
+            f"Categories: {', '.join(category_filter)}\n"
+            f"Use this format with category headers:\n"
+            f"{_format_example(tuple(category_filter))}"
+        ]
+        if "Coding Test" in category_filter:
+            parts.append(CODING_TEST_PROMPT)
+        if questions_only:
+            # Kept out of TASK_PROMPT so that stays identical for prompt caching
+            parts.append(QUESTIONS_ONLY_PROMPT)
+        parts.append(f"\n\nResume Content:\n{self._truncate(resume_text)}")
+        return "".join(parts)
+    
+    def _truncate(self, text: str, max_tokens: int = MAX_RESUME_TOKENS) -> str:
+        """Cut text to at most max_tokens tokens of the current model"""
+        if len(text) <= max_tokens:
+            # A token is at least one character
+            return text
+        encoding = _get_encoding(self.model)
+        if encoding is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        truncated: str = encoding.decode(tokens[:max_tokens])
+        return truncated
+
+    def parse_response(self, llm_response: str) -> Dict:
+        """
+        Parse the LLM's JSON response once into all of its parts.
+        Args:
+            llm_response: Raw text from OpenAI response (expected to be JSON)
+        Returns:
+            Dict: "questions", "insights" and "ats_suggestions", empty when missing or unparseable
+        """
+        try:
+            data = json.loads(llm_response)
+        except Exception as e:
+            st.error(f"Failed to parse LLM response: {e}")
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        return {
+            "questions": data.get("questions", []),
+            "insights": data.get("insights", {}),
+            "ats_suggestions": data.get("ats_suggestions", []),
+        }
+    
+    def _parse_questions(self, llm_response: str) -> List[Dict]:
+        """
+        Parse the questions from the LLM's JSON response.
+        Args:
+            llm_response: Raw text from OpenAI response (expected to be JSON)
+        Returns:
+            List[Dict]: Structured questions with categories and difficulty levels
+        """
+        questions: List[Dict] = self.parse_response(llm_response)["questions"]
+        return questions
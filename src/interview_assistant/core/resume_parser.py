@@ -3,11 +3,87 @@ Resume Parser Module
 Handles extraction of text from PDF and Word documents
 """
 
-import PyPDF2
-from docx import Document
 import streamlit as st
-from typing import Optional
-import re
+from types import ModuleType
+from typing import Any, Iterable, Iterator, List, Optional
+from functools import lru_cache
+import importlib
+import io
+
+# The PDF and Word libraries are imported on first use rather than here, so app
+# start-up and reruns without an upload don't pay for loading them
+
+# clean_text deletes these: C0/C1 control characters and DEL, except whitespace
+_CONTROL_CHARS = dict.fromkeys(
+    (c for c in (*range(0x20), *range(0x7f, 0xa0)) if not chr(c).isspace()),
+    None
+)
+
+# DOCX run content that contributes to paragraph text, as python-docx renders it
+# (qualified tag names spelled out, as docx.oxml.ns.qn would build them)
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = _W_NS + 'p'
+_W_T = _W_NS + 't'
+_DOCX_SPECIAL_TEXT = {
+    _W_NS + 'tab': '\t',
+    _W_NS + 'br': '\n',
+    _W_NS + 'cr': '\n',
+    _W_NS + 'noBreakHyphen': '-',
+}
+_DOCX_TEXT_TAGS = (_W_T, *_DOCX_SPECIAL_TEXT)
+
+
+def _as_buffer(file: Any) -> io.BytesIO:
+    """
+    Get file content as an in-memory buffer so parsers seek and read without I/O.
+    BytesIO objects, including Streamlit uploads, are used as they are.
+    """
+    if isinstance(file, io.BytesIO):
+        return file
+    if isinstance(file, (bytes, bytearray)):
+        return io.BytesIO(file)
+    return io.BytesIO(file.read())
+
+
+@lru_cache(maxsize=None)
+def _load_pdfium() -> Optional[ModuleType]:
+    """Import pypdfium2 once; None when it is not installed (PyPDF2 is used instead)"""
+    try:
+        return importlib.import_module("pypdfium2")
+    except ImportError:
+        return None
+
+
+def _pdf_pages_pdfium(pdfium: ModuleType, data: bytes) -> Iterator[str]:
+    """Yield page texts with PDFium (native, much faster than PyPDF2)"""
+    pdf = pdfium.PdfDocument(data)
+    try:
+        for page in pdf:
+            text_page = page.get_textpage()
+            page_text = text_page.get_text_bounded()
+            text_page.close()
+            page.close()
+            yield page_text
+    finally:
+        pdf.close()
+
+
+def _pdf_pages_pypdf2(buffer: io.BytesIO) -> Iterator[str]:
+    """Yield page texts with PyPDF2"""
+    import PyPDF2
+    
+    pdf_reader = PyPDF2.PdfReader(buffer)
+    for page in pdf_reader.pages:
+        yield page.extract_text() or ""
+
+
+def _clean_pages(pages: Iterable[str]) -> str:
+    """
+    Clean page texts one at a time and join the non-empty results, so raw text
+    for the whole document is never held at once. Same result as cleaning the
+    joined pages, since clean_text folds the whitespace around each join anyway.
+    """
+    return " ".join(filter(None, map(ResumeParser.clean_text, pages)))
 
 
 class ResumeParser:
@@ -27,83 +103,86 @@ class ResumeParser:
         if not text:
             return ""
         
-        # Remove excessive newlines and replace with single spaces
-        text = re.sub(r'\n+', ' ', text)
-        
-        # Remove excessive spaces (more than 2 consecutive spaces)
-        text = re.sub(r' {2,}', ' ', text)
-        
-        # Remove leading/trailing whitespace
-        text = text.strip()
+        # Fast path: printable ASCII has no bullets and no whitespace besides
+        # spaces, so without a double space there is nothing to normalize
+        if text.isascii() and text.isprintable() and '  ' not in text:
+            return text.strip()
         
-        # Normalize bullet points and special characters
-        text = re.sub(r'●\s*', '• ', text)
-        text = re.sub(r'•\s*', '• ', text)
+        # Drop control characters that PDF extraction leaves behind (NULs,
+        # escapes); whitespace controls are left for the collapse below
+        text = text.translate(_CONTROL_CHARS)
         
-        # Clean up common formatting artifacts
-        text = re.sub(r'\s+([•\-])', r' \1', text)  # Ensure proper spacing before bullets
-        text = re.sub(r'([•\-])\s+', r'\1 ', text)  # Ensure proper spacing after bullets
+        # Normalize bullet points and give each one a trailing space; the
+        # collapse below folds it into any whitespace that already followed
+        text = text.replace('●', '•').replace('•', '• ')
         
-        # Remove any remaining excessive whitespace
-        text = re.sub(r' +', ' ', text)
-        
-        return text
+        # Collapse every run of whitespace, newlines included, to one space
+        # and drop it from both ends
+        return ' '.join(text.split())
     
     @staticmethod
-    def extract_text_from_pdf(pdf_file) -> Optional[str]:
+    def extract_text_from_pdf(pdf_file: Any) -> Optional[str]:
         """
         Extract text from PDF file
         
         Args:
-            pdf_file: Uploaded PDF file object
+            pdf_file: Uploaded PDF file object, file-like object or raw bytes
             
         Returns:
             str: Extracted text from PDF
         """
         try:
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
+            buffer = _as_buffer(pdf_file)
+            pdfium = _load_pdfium()
+            if pdfium is not None:
+                try:
+                    return _clean_pages(_pdf_pages_pdfium(pdfium, buffer.getvalue()))
+                except Exception:
+                    # Let PyPDF2 have a go at files PDFium rejects
+                    pass
             
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + " "
-                
             # Clean the extracted text
-            cleaned_text = ResumeParser.clean_text(text)
-            return cleaned_text
+            return _clean_pages(_pdf_pages_pypdf2(buffer))
         except Exception as e:
             st.error(f"Error reading PDF file: {str(e)}")
             return None
     
     @staticmethod
-    def extract_text_from_docx(docx_file) -> Optional[str]:
+    def extract_text_from_docx(docx_file: Any) -> Optional[str]:
         """
         Extract text from Word document
         
         Args:
-            docx_file: Uploaded Word file object
+            docx_file: Uploaded Word file object, file-like object or raw bytes
             
         Returns:
             str: Extracted text from Word document
         """
         try:
-            doc = Document(docx_file)
-            text = ""
+            from docx import Document
             
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():  # Only add non-empty paragraphs
-                    text += paragraph.text + " "
+            doc = Document(_as_buffer(docx_file))
+            parts: List[str] = []
+            
+            # Walk the body's w:p elements directly rather than building a
+            # python-docx Paragraph (and Run objects) for every paragraph
+            for p in doc.element.body.iterchildren(_W_P):
+                paragraph_text = "".join(
+                    (node.text or "") if node.tag == _W_T else _DOCX_SPECIAL_TEXT[node.tag]
+                    for node in p.iter(*_DOCX_TEXT_TAGS)
+                )
+                if paragraph_text.strip():  # Only add non-empty paragraphs
+                    parts.append(paragraph_text)
                 
             # Clean the extracted text
-            cleaned_text = ResumeParser.clean_text(text)
+            cleaned_text = ResumeParser.clean_text(" ".join(parts))
             return cleaned_text
         except Exception as e:
             st.error(f"Error reading Word document: {str(e)}")
             return None
     
     @staticmethod
-    def parse_resume(uploaded_file) -> Optional[str]:
+    def parse_resume(uploaded_file: Any) -> Optional[str]:
         """
         Parse resume file based on its type
         
@@ -115,13 +194,27 @@ class ResumeParser:
         """
         if uploaded_file is None:
             return None
-            
-        file_type = uploaded_file.type
         
-        if file_type == "application/pdf":
-            return ResumeParser.extract_text_from_pdf(uploaded_file)
-        elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            return ResumeParser.extract_text_from_docx(uploaded_file)
-        else:
-            st.error("Unsupported file format. Please upload a PDF or Word document.")
-            return None 
\ No newline at end of file
+        return _parse_bytes(uploaded_file.getvalue(), uploaded_file.type)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _parse_bytes(data: bytes, file_type: str) -> Optional[str]:
+    """
+    Parse resume file content based on its type. Cached on the file bytes, so
+    Streamlit reruns with the same upload skip PDF/DOCX extraction entirely.
+    
+    Args:
+        data: Raw file content
+        file_type: MIME type of the file
+        
+    Returns:
+        str: Extracted text from resume
+    """
+    if file_type == "application/pdf":
+        return ResumeParser.extract_text_from_pdf(io.BytesIO(data))
+    elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+        return ResumeParser.extract_text_from_docx(io.BytesIO(data))
+    else:
+        st.error("Unsupported file format. Please upload a PDF or Word document.")
+        return None
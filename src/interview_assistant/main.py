@@ -4,28 +4,26 @@ Streamlit app for AI-powered interview question generation
 """
 
 import streamlit as st
-import pandas as pd
+import asyncio
+from collections import defaultdict
 import sys
 import os
+from typing import TYPE_CHECKING, Callable, List
 
-# Add the src directory to Python path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+# Add the src directory to Python path for imports (once; run_app.py may already have)
+_SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
 
 from interview_assistant.core.resume_parser import ResumeParser
-from interview_assistant.core.question_generator import QuestionGenerator
-from interview_assistant.utils.helpers import format_questions_for_export
-import time
+from interview_assistant.core.categories import QUESTION_CATEGORIES, DEFAULT_CATEGORIES
+from interview_assistant.utils.helpers import format_questions_for_export, format_questions_as_csv
 
-# Page configuration
-st.set_page_config(
-    page_title="Interview Assistant",
-    page_icon="🎯",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+if TYPE_CHECKING:
+    from interview_assistant.core.question_generator import QuestionGenerator
 
 # Custom CSS for better styling
-st.markdown("""
+_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -81,10 +79,56 @@ st.markdown("""
         color: #721c24 !important;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Card and badge CSS classes for each difficulty level
+_DIFF_CLASSES = {
+    difficulty: (f"difficulty-{difficulty.lower()}", f"category-badge {difficulty.lower()}")
+    for difficulty in ("Easy", "Medium", "Hard")
+}
+
+# Question card markup, filled in with str.format
+_CODING_CARD_HTML = """
+<div class="question-card {difficulty_class}">
+    <div style="display: flex; justify-content: end; align-items: center; margin-bottom: 0.5rem;">
+        <span class="{badge_class}">{difficulty}</span>
+    </div>
+</div>
+"""
+_QUESTION_CARD_HTML = """
+<div class="question-card {difficulty_class}">
+    <div style="display: flex; justify-content: end; align-items: center; margin-bottom: 0.5rem;">
+        <span class="{badge_class}">
+            {difficulty}
+        </span>
+    </div>
+    <p style="margin: 0; font-size: 1.1rem;"><strong>{number}.</strong> {question}</p>
+</div>
+"""
+
+def _difficulty_classes(difficulty: str) -> tuple:
+    """Card and badge CSS classes for a difficulty level"""
+    classes = _DIFF_CLASSES.get(difficulty)
+    if classes is None:
+        # Off-list values from the model keep the old derived class names
+        classes = (f"difficulty-{difficulty.lower()}", f"category-badge {difficulty.lower()}")
+    return classes
 
-def main():
+def _configure_page() -> None:
+    """Apply page configuration and custom CSS"""
+    # Runs from main() on every rerun: run_app.py imports this module only once,
+    # so anything done at import time is missing from every rerun after the first
+    st.set_page_config(
+        page_title="Interview Assistant",
+        page_icon="🎯",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(_CSS, unsafe_allow_html=True)
+
+def main() -> None:
     """Main application function"""
+    _configure_page()
     
     # Header
     st.markdown('<h1 class="main-header">🎯 Interview Assistant</h1>', unsafe_allow_html=True)
@@ -114,8 +158,8 @@ def main():
         # Category filter
         category_filter = st.multiselect(
             "Question Categories",
-            options=["Technical Skills", "Experience & Projects", "Problem Solving", "Behavioral", "Coding Test"],
-            default=["Technical Skills"],
+            options=list(QUESTION_CATEGORIES),
+            default=list(DEFAULT_CATEGORIES),
             help="Select categories to focus on (Technical: Skills & tools, Experience: Past work, Problem Solving: Analytical thinking, Behavioral: Soft skills, Coding Test: LeetCode-style coding questions)"
         )
         
@@ -184,13 +228,14 @@ def main():
                     st.text_area("Cleaned Resume Content", cleaned_preview, height=200, help="Cleaned and formatted text that will be sent to the AI")
                     
                     # Show text statistics
+                    char_count, word_count, line_count = resume_stats(resume_text)
                     col1, col2, col3 = st.columns(3)
                     with col1:
-                        st.metric("Total Characters", len(resume_text))
+                        st.metric("Total Characters", char_count)
                     with col2:
-                        st.metric("Words", len(resume_text.split()))
+                        st.metric("Words", word_count)
                     with col3:
-                        st.metric("Lines", resume_text.count('\n') + 1)
+                        st.metric("Lines", line_count)
                 
                 # Generate questions button
                 if st.button("🚀 Generate Questions", type="primary", use_container_width=True):
@@ -207,7 +252,7 @@ def main():
                 if 'questions' in st.session_state and st.session_state.questions:
                     st.markdown("---")
                     st.subheader("🎯 Generated Questions")
-                    display_questions(st.session_state.questions)
+                    questions_panel()
                 
 
     with col2:
@@ -216,114 +261,176 @@ def main():
         # Show summary info
         if 'questions' in st.session_state and st.session_state.questions:
             questions = st.session_state.questions
-            categories = {}
-            for question in questions:
-                category = question['category']
-                if category not in categories:
-                    categories[category] = []
-                categories[category].append(question)
+            questions_by_category = st.session_state.questions_by_category
             
             # Show statistics
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric("Total Questions", len(questions))
             with col2:
-                st.metric("Categories", len(categories))
+                st.metric("Categories", len(questions_by_category))
             with col3:
-                hard_count = sum(1 for q in questions if q['difficulty'] == 'Hard')
-                st.metric("Hard Questions", hard_count)
+                st.metric("Hard Questions", st.session_state.hard_question_count)
             
             # Show category breakdown
             st.markdown("---")
             st.subheader("📂 Category Breakdown")
-            for category, category_questions in categories.items():
+            for category, category_questions in questions_by_category.items():
                 st.write(f"**{category}**: {len(category_questions)} questions")
         else:
             st.info("👆 Upload a resume and click 'Generate Questions' to see statistics!")
 
-def generate_questions(resume_text: str, question_count: int, difficulty_filter: list, category_filter: list):
+def resume_stats(resume_text: str) -> tuple:
+    """Character, word and line counts for the resume, recomputed only when the text changes"""
+    text_hash = hash(resume_text)
+    cached = st.session_state.get('_resume_stats')
+    if cached is None or cached[0] != text_hash:
+        stats = (len(resume_text), len(resume_text.split()), resume_text.count('\n') + 1)
+        cached = (text_hash, stats)
+        st.session_state._resume_stats = cached
+    return cached[1]
+
+def summarize_questions(questions: list) -> tuple:
+    """Group questions by category (keeping first-seen order) and count the hard ones in one pass"""
+    questions_by_category = defaultdict(list)
+    hard_count = 0
+    for question in questions:
+        questions_by_category[question['category']].append(question)
+        if question['difficulty'] == 'Hard':
+            hard_count += 1
+    return dict(questions_by_category), hard_count
+
+@st.cache_resource(show_spinner=False)
+def get_question_generator() -> "QuestionGenerator":
+    """
+    QuestionGenerator shared by every session, so its OpenAI client and that
+    client's keep-alive connections are reused instead of rebuilt per click
+    """
+    from interview_assistant.core.question_generator import QuestionGenerator
+    return QuestionGenerator()
+
+def generate_questions(resume_text: str, question_count: int, difficulty_filter: list, category_filter: list) -> None:
     """Generate interview questions using OpenAI"""
     with st.spinner("🤖 Generating questions with AI..."):
-        generator = QuestionGenerator()
+        generator = get_question_generator()
         try:
-            coding_test_selected = "Coding Test" in category_filter
-            coding_test_instruction = ""
-            if coding_test_selected:
-                coding_test_instruction = (
-                    "\n\nAdditionally, generate up to 2 LeetCode-style coding questions in Python for the 'Coding Test' category. "
-                    "Each coding question should include: a clear problem statement, input/output format, at least 2 sample test cases, and difficulty based on the selected level. "
-                    "Format the coding questions with a markdown code block for the function signature and test cases."
-                )
-            prompt = generator._create_question_prompt(resume_text, question_count, difficulty_filter, category_filter) + coding_test_instruction
-            response = generator.client.chat.completions.create(
-                model=generator.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert interviewer who creates relevant and insightful interview questions based on candidate resumes. You are also expert in python, pyspark, java, c++, c, javascript, html, css, sql databases, nosql databases, data structures, data modeling, algorithms, system design, microservices, distributed systems, cloud computing, artificial intelligence, machine learning, deep learning, natural language processing, computer vision, robotics, and other related technologies. You are also expert in data analysis, data visualization, data engineering, data science, data warehousing, data modeling, data cleaning, data integration, data transformation, data loading, data unloading, data archiving, data backup, data recovery, data replication, data synchronization, data migration, REST APIs, CICD pipelines, and other related technologies."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            llm_response = response.choices[0].message.content
-            questions = generator._parse_questions(llm_response)
-            insights = generator._parse_insights(llm_response)
-            ats_suggestions = generator._parse_ats_suggestions(llm_response)
+            # Show questions as soon as the model finishes them
+            placeholder = st.empty()
+            streamed: List[str] = []
+            
+            def show(new_questions: list) -> None:
+                for question in new_questions:
+                    streamed.append(f"{len(streamed) + 1}. **[{question.get('difficulty', '')}]** {question.get('question', '')}")
+                placeholder.markdown("\n".join(streamed))
+            
+            if len(category_filter) > 1:
+                # One concurrent request per category, each shown when it completes
+                parsed = asyncio.run(generator.agenerate_questions(
+                    resume_text, question_count, difficulty_filter, category_filter, on_questions=show
+                ))
+            else:
+                stream = generator.generate_questions_stream(resume_text, question_count, difficulty_filter, category_filter)
+                shown = []
+                while True:
+                    try:
+                        question = next(stream)
+                    except StopIteration as done:
+                        # The stream returns the full response (with insights and ATS
+                        # suggestions), so nothing is requested a second time
+                        llm_response = done.value
+                        break
+                    shown.append(question)
+                    show([question])
+                parsed = generator.parse_response(llm_response)
+                # A truncated response does not parse; keep the questions that did arrive
+                parsed["questions"] = parsed["questions"] or shown
+            questions = parsed["questions"]
+            # Summarize before touching session state, so a malformed question
+            # leaves the previous results intact instead of half-replaced
+            questions_by_category, hard_count = summarize_questions(questions)
             st.session_state.questions = questions
-            st.session_state.resume_insights = insights
-            st.session_state.ats_suggestions = ats_suggestions
+            st.session_state.questions_by_category = questions_by_category
+            st.session_state.hard_question_count = hard_count
+            st.session_state.resume_insights = parsed["insights"]
+            st.session_state.ats_suggestions = parsed["ats_suggestions"]
+            # The cards rendered below the button in this same run replace the preview
+            placeholder.empty()
             st.success(f"✅ Generated {len(questions)} questions!")
-            st.rerun()
         except Exception as e:
             st.error(f"❌ Failed to generate questions and insights: {e}")
 
-def display_questions(questions: list):
+def question_cards_html(questions_by_category: dict) -> dict:
+    """Heading and card HTML for each category (except Coding Test), rebuilt only when the questions change"""
+    cached = st.session_state.get('_question_cards')
+    if cached is None or cached[0] is not questions_by_category:
+        cards = {}
+        for category, category_questions in questions_by_category.items():
+            if category == "Coding Test":
+                continue  # rendered element by element in display_questions
+            html_parts = [f"### 📂 {category}\n"]
+            for i, question in enumerate(category_questions, 1):
+                difficulty = question['difficulty']
+                difficulty_class, difficulty_badge_class = _difficulty_classes(difficulty)
+                html_parts.append(_QUESTION_CARD_HTML.format(
+                    difficulty_class=difficulty_class,
+                    badge_class=difficulty_badge_class,
+                    difficulty=difficulty,
+                    number=i,
+                    question=question['question']
+                ))
+            cards[category] = "".join(html_parts)
+        cached = (questions_by_category, cards)
+        st.session_state._question_cards = cached
+    return cached[1]
+
+# st.fragment (st.experimental_fragment before 1.37) where available; older
+# Streamlit versions just render the panel as part of the full run
+_fragment: Callable[[Callable[[], None]], Callable[[], None]] = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda func: func)
+
+@_fragment
+def questions_panel() -> None:
+    """Generated questions and export buttons; their clicks rerun only this panel"""
+    display_questions(st.session_state.questions, st.session_state.questions_by_category)
+
+def display_questions(questions: list, questions_by_category: dict) -> None:
     """Display generated questions with filtering"""
     
     filtered_questions = questions
     if not filtered_questions:
         st.warning("No questions match the current filters. Try adjusting the filter settings.")
         return
-
-    # Display questions by category
-    categories = {}
-    for question in filtered_questions:
-        category = question['category']
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(question)
     
-    # Display questions by category
-    for category, category_questions in categories.items():
+    # Display questions by category. Runs of plain categories go out as a single
+    # markdown element; Coding Test mixes in code blocks, so it is rendered piecewise.
+    # Categories are joined with a blank line: an HTML block only ends at one, so
+    # without it the next "###" heading would be swallowed as literal text.
+    cards = question_cards_html(questions_by_category)
+    pending = []
+    for category, category_questions in questions_by_category.items():
+        if category != "Coding Test":
+            pending.append(cards[category])
+            continue
+        if pending:
+            st.markdown("\n\n".join(pending), unsafe_allow_html=True)
+            pending = []
         st.subheader(f"📂 {category}")
         for i, question in enumerate(category_questions, 1):
-            difficulty_class = f"difficulty-{question['difficulty'].lower()}"
-            difficulty_badge_class = f"category-badge {question['difficulty'].lower()}"
-            if category == "Coding Test":
-                st.markdown(f"""
-                <div class="question-card {difficulty_class}">
-                    <div style="display: flex; justify-content: end; align-items: center; margin-bottom: 0.5rem;">
-                        <span class="{difficulty_badge_class}">{question['difficulty']}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                st.markdown(f"**{i}. {question['question']}**")
-                if 'instructions' in question:
-                    st.markdown(question['instructions'])
-                if 'test_cases' in question:
-                    st.markdown("**Sample Test Cases:**")
-                    for tc in question['test_cases']:
-                        st.code(tc, language="python")
-            else:
-                st.markdown(f"""
-                <div class="question-card {difficulty_class}">
-                    <div style="display: flex; justify-content: end; align-items: center; margin-bottom: 0.5rem;">
-                        <span class="{difficulty_badge_class}">
-                            {question['difficulty']}
-                        </span>
-                    </div>
-                    <p style="margin: 0; font-size: 1.1rem;"><strong>{i}.</strong> {question['question']}</p>
-                </div>
-                """, unsafe_allow_html=True)
+            difficulty = question['difficulty']
+            difficulty_class, difficulty_badge_class = _difficulty_classes(difficulty)
+            st.markdown(_CODING_CARD_HTML.format(
+                difficulty_class=difficulty_class,
+                badge_class=difficulty_badge_class,
+                difficulty=difficulty
+            ), unsafe_allow_html=True)
+            st.markdown(f"**{i}. {question['question']}**")
+            if 'instructions' in question:
+                st.markdown(question['instructions'])
+            if 'test_cases' in question:
+                st.markdown("**Sample Test Cases:**")
+                for tc in question['test_cases']:
+                    st.code(tc, language="python")
+    if pending:
+        st.markdown("\n\n".join(pending), unsafe_allow_html=True)
     
     if 'resume_insights' in st.session_state and st.session_state.resume_insights:
         st.markdown("---")
@@ -348,10 +455,19 @@ def display_questions(questions: list):
         if st.button("📋 Copy to Clipboard", use_container_width=True):
             export_to_clipboard(filtered_questions)
 
-def export_to_csv(questions: list):
+@st.cache_data(show_spinner=False, max_entries=8)
+def _questions_csv(questions: list) -> str:
+    """CSV text for the questions, memoized on their content"""
+    return format_questions_as_csv(questions)
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _questions_text(questions: list) -> str:
+    """Clipboard text for the questions, memoized on their content"""
+    return format_questions_for_export(questions)
+
+def export_to_csv(questions: list) -> None:
     """Export questions to CSV format"""
-    df = pd.DataFrame(questions)
-    csv = df.to_csv(index=False)
+    csv = _questions_csv(questions)
     
     st.download_button(
         label="💾 Download CSV",
@@ -360,14 +476,14 @@ def export_to_csv(questions: list):
         mime="text/csv"
     )
 
-def export_to_clipboard(questions: list):
+def export_to_clipboard(questions: list) -> None:
     """Export questions to clipboard-friendly format"""
-    formatted_text = format_questions_for_export(questions)
+    formatted_text = _questions_text(questions)
     
     st.text_area("Copy the questions below:", formatted_text, height=300)
     st.success("📋 Questions formatted for clipboard!")
 
-def display_resume_insights(insights: dict):
+def display_resume_insights(insights: dict) -> None:
     """Display extracted resume insights in a structured format."""
     if not insights:
         st.info("No insights extracted from resume.")
@@ -391,7 +507,7 @@ def display_resume_insights(insights: dict):
         for proj in insights['major_projects']:
             st.markdown(f"- {proj}")
 
-def display_ats_suggestions(suggestions: list):
+def display_ats_suggestions(suggestions: list) -> None:
     """Display ATS optimization suggestions."""
     if not suggestions:
         st.info("No ATS suggestions available.")
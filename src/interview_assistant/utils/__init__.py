@@ -4,10 +4,12 @@ Utility functions for the Interview Assistant.
 
 from .helpers import (
     format_questions_for_export,
+    format_questions_as_csv,
     validate_file_upload,
 )
 
 __all__ = [
     "format_questions_for_export",
+    "format_questions_as_csv",
     "validate_file_upload",
 ] 
\ No newline at end of file
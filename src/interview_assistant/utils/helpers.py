@@ -3,7 +3,16 @@ Utility functions for the Interview Assistant application
 """
 
 import streamlit as st
-from typing import List, Dict
+from typing import Any, List, Dict
+import csv
+import io
+from collections import defaultdict
+
+
+_ALLOWED_TYPES = frozenset({
+    'application/pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+})
 
 
 def format_questions_for_export(questions: List[Dict]) -> str:
@@ -20,31 +29,43 @@ def format_questions_for_export(questions: List[Dict]) -> str:
         return "No questions available for export."
     
     # Group by category
-    categories = {}
+    categories = defaultdict(list)
     for question in questions:
-        category = question['category']
-        if category not in categories:
-            categories[category] = []
-        categories[category].append(question)
+        categories[question['category']].append(question)
     
     # Format output
-    output = "INTERVIEW QUESTIONS\n"
-    output += "=" * 50 + "\n\n"
+    parts = ["INTERVIEW QUESTIONS\n", "=" * 50, "\n\n"]
     
     for category, category_questions in categories.items():
-        output += f"{category.upper()}\n"
-        output += "-" * len(category) + "\n"
+        parts.append(f"{category.upper()}\n{'-' * len(category)}\n")
         
         for i, question in enumerate(category_questions, 1):
-            output += f"{i}. {question['question']}\n"
-            output += f"   Difficulty: {question['difficulty']}\n\n"
+            parts.append(f"{i}. {question['question']}\n   Difficulty: {question['difficulty']}\n\n")
         
-        output += "\n"
+        parts.append("\n")
+    
+    return "".join(parts)
+
+
+def format_questions_as_csv(questions: List[Dict]) -> str:
+    """
+    Format questions as CSV, one column per field in order of first appearance
     
-    return output
+    Args:
+        questions: List of question dictionaries
+        
+    Returns:
+        str: CSV text with a header row
+    """
+    fieldnames = list(dict.fromkeys(key for question in questions for key in question))
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(questions)
+    return buffer.getvalue()
 
 
-def validate_file_upload(uploaded_file) -> bool:
+def validate_file_upload(uploaded_file: Any) -> bool:
     """
     Validate uploaded file format and size
     
@@ -58,8 +79,7 @@ def validate_file_upload(uploaded_file) -> bool:
         return False
     
     # Check file type
-    allowed_types = ['application/pdf', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document']
-    if uploaded_file.type not in allowed_types:
+    if uploaded_file.type not in _ALLOWED_TYPES:
         st.error("❌ Invalid file type. Please upload a PDF or Word document.")
         return False
     
@@ -2,9 +2,65 @@
 Tests for core functionality.
 """
 
+import asyncio
+import io
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import openai
 import pytest
+from docx import Document
+from interview_assistant.core import resume_parser
 from interview_assistant.core.resume_parser import ResumeParser
-from interview_assistant.core.question_generator import QuestionGenerator
+from interview_assistant.core.question_generator import QuestionGenerator, _QuestionStreamParser
+
+
+def make_pdf(pages):
+    """Build a minimal PDF with one Helvetica text line per entry of each page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "".join(f"BT /F1 12 Tf 72 {720 - 20 * i} Td ({line}) Tj ET\n" for i, line in enumerate(lines))
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}endstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+                       "/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    
+    pdf, offsets = "%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return pdf.encode("latin-1")
+
+
+def fake_client(create):
+    """Stand-in OpenAI client whose chat.completions.create is the given function."""
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def completion(content, finish_reason="stop"):
+    """Chat completion response with a single choice."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason=finish_reason)])
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    """QuestionGenerator with a test API key, empty caches and the semantic cache off."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("QG_SEMANTIC_CACHE", "0")
+    monkeypatch.setattr(QuestionGenerator, "_cache", {})
+    monkeypatch.setattr(QuestionGenerator, "_embeddings", {})
+    monkeypatch.setattr(QuestionGenerator, "_semantic_index", (None, []))
+    return QuestionGenerator()
 
 
 class TestResumeParser:
@@ -14,6 +70,44 @@ class TestResumeParser:
         """Test parsing with None input."""
         result = ResumeParser.parse_resume(None)
         assert result is None
+    
+    def test_parse_resume_docx(self):
+        """Test parsing an uploaded Word document."""
+        document = Document()
+        document.add_paragraph("Jane Doe")
+        document.add_paragraph("")
+        document.add_paragraph("●Python  developer")
+        buffer = io.BytesIO()
+        document.save(buffer)
+        uploaded_file = SimpleNamespace(
+            getvalue=buffer.getvalue,
+            type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        )
+        assert ResumeParser.parse_resume(uploaded_file) == "Jane Doe • Python developer"
+    
+    @pytest.mark.parametrize("use_pdfium", [True, False])
+    def test_extract_text_from_pdf(self, monkeypatch, use_pdfium):
+        """Test that PDFium and the PyPDF2 fallback extract the same cleaned text."""
+        if not use_pdfium:
+            monkeypatch.setattr(resume_parser, "_load_pdfium", lambda: None)
+        elif resume_parser._load_pdfium() is None:
+            pytest.skip("pypdfium2 is not installed")
+        pdf = make_pdf([["Jane Doe", "Python  developer"], [], ["Skills: SQL"]])
+        assert ResumeParser.extract_text_from_pdf(pdf) == "Jane Doe Python developer Skills: SQL"
+    
+    @pytest.mark.parametrize("raw, expected", [
+        ("", ""),
+        ("  Plain single-spaced text ", "Plain single-spaced text"),
+        ("Line one\nLine two\n\n\nLine three", "Line one Line two Line three"),
+        ("Tabs\t\tand   spaces", "Tabs and spaces"),
+        ("Name:\tJane\r\nRole:\tDev", "Name: Jane Role: Dev"),
+        ("●Python\n●  SQL •\tGo", "• Python • SQL • Go"),
+        ("Skills:\n  •Java  ", "Skills: • Java"),
+        ("Py\x00thon\x07 and\x0bSQL\x7f", "Python and SQL"),
+    ])
+    def test_clean_text(self, raw, expected):
+        """Test whitespace and bullet normalization."""
+        assert ResumeParser.clean_text(raw) == expected
 
 
 class TestQuestionGenerator:
@@ -23,4 +117,350 @@ class TestQuestionGenerator:
         """Test QuestionGenerator initialization."""
         # This test would require a mock API key
         # For now, we'll just test the class exists
-        assert QuestionGenerator is not None 
\ No newline at end of file
+        assert QuestionGenerator is not None
+    
+    def test_cache_key_ignores_filter_order(self, generator):
+        """Test that reordered filters map to the same cache entry."""
+        key_a = generator._cache_key("resume", 5, ["Easy", "Hard"], ["Behavioral", "Technical Skills"])
+        key_b = generator._cache_key(" resume ", 5, ["Hard", "Easy"], ["Technical Skills", "Behavioral"])
+        assert key_a == key_b
+        assert key_a != generator._cache_key("resume", 6, ["Easy", "Hard"], ["Behavioral", "Technical Skills"])
+    
+    def test_generate_response_uses_cache(self, generator):
+        """Test that a cached response is returned without calling OpenAI."""
+        generator.client = None
+        key = generator._cache_key("resume", 3, ["Easy"], ["Behavioral"])
+        QuestionGenerator._cache[key] = (time.time(), '{"questions": []}')
+        assert generator.generate_response("resume", 3, ["Easy"], ["Behavioral"]) == '{"questions": []}'
+    
+    @pytest.mark.parametrize("content, finish_reason", [
+        ('{"questions": [{"category": "Behavioral"', "length"),
+        ("Sorry, I can't help with that.", "stop"),
+    ])
+    def test_incomplete_response_is_not_cached(self, generator, content, finish_reason):
+        """Test that truncated or non-JSON output is returned but not cached."""
+        generator.client = fake_client(lambda **kwargs: completion(content, finish_reason))
+        assert generator.generate_response("resume", 1, ["Easy"], ["Behavioral"]) == content
+        assert QuestionGenerator._cache == {}
+    
+    def test_cache_evicts_least_recently_used(self, monkeypatch, generator):
+        """Test that the response cache stays bounded and keeps recently used entries."""
+        monkeypatch.setattr("interview_assistant.core.question_generator.CACHE_MAX_ENTRIES", 2)
+        generator._cache_put("a", "response a")
+        generator._cache_put("b", "response b")
+        assert generator._cached_response("a", "resume", ())[0] == "response a"
+        generator._cache_put("c", "response c")
+        assert list(QuestionGenerator._cache) == ["a", "c"]
+    
+    def test_cache_is_safe_across_threads(self, monkeypatch, generator):
+        """Test that concurrent lookups and inserts keep the cache consistent and bounded."""
+        monkeypatch.setattr("interview_assistant.core.question_generator.CACHE_MAX_ENTRIES", 4)
+        errors = []
+        
+        def worker(offset):
+            try:
+                for i in range(2000):
+                    key = str((offset + i) % 8)
+                    generator._cache_put(key, f"response {key}")
+                    response = generator._cached_response(key, "resume", ())[0]
+                    assert response in (None, f"response {key}")
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert errors == []
+        assert len(QuestionGenerator._cache) <= 4
+    
+    def test_semantic_cache_matches_similar_resume(self, generator):
+        """Test that a near-identical embedding with the same filters is a hit."""
+        signature = generator._filter_signature(5, ["Easy"], ["Behavioral"])
+        generator._semantic_store(np.array([1.0, 0.0], dtype=np.float32), signature, "cached")
+        
+        similar = np.array([0.99, 0.141], dtype=np.float32)
+        similar /= np.linalg.norm(similar)
+        assert generator._semantic_lookup(similar, signature) == "cached"
+        assert generator._semantic_lookup(similar, generator._filter_signature(5, ["Hard"], ["Behavioral"])) is None
+        assert generator._semantic_lookup(np.array([0.0, 1.0], dtype=np.float32), signature) is None
+    
+    def test_semantic_hit_reuses_only_questions(self, generator):
+        """Test that a similar resume gets the cached questions but not the other resume's insights."""
+        content = json.dumps({"questions": [{"question": "Q1"}], "insights": {"companies": [{"name": "Acme"}]},
+                              "ats_suggestions": ["Add metrics"]})
+        calls = []
+        generator.client = fake_client(lambda **kwargs: calls.append(kwargs) or completion(content))
+        generator.client.embeddings = SimpleNamespace(create=lambda **kwargs: SimpleNamespace(data=[SimpleNamespace(embedding=[1.0, 0.0])]))
+        generator.semantic_cache = True
+        
+        assert generator.generate_response("Jane Doe, Acme", 1, ["Easy"], ["Behavioral"]) == content
+        reused = json.loads(generator.generate_response("John Roe, Acme", 1, ["Easy"], ["Behavioral"]))
+        assert reused == {"questions": [{"question": "Q1"}]}
+        assert len(calls) == 1
+    
+    def test_resume_is_embedded_once(self, generator):
+        """Test that repeated lookups for one resume share a single embeddings call."""
+        calls = []
+        
+        def create(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(data=[SimpleNamespace(embedding=[3.0, 4.0])])
+        
+        generator.client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+        assert generator._embed_resume("resume").tolist() == pytest.approx([0.6, 0.8])
+        assert generator._embed_resume("resume") is generator._embed_resume("resume")
+        assert len(calls) == 1
+    
+    def test_generate_questions_batch_maps_results_to_resumes(self, monkeypatch, generator):
+        """Test that batch output lines are mapped back by custom_id and cached."""
+        monkeypatch.setenv("QG_BATCH_MODE", "1")
+        
+        def output_line(index, question):
+            content = json.dumps({"questions": [{"category": "Behavioral", "difficulty": "Easy", "question": question}]})
+            return json.dumps({
+                "custom_id": f"resume-{index}",
+                "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}, "finish_reason": "stop"}]}},
+            })
+        
+        output = "\n".join([output_line(1, "Second?"), output_line(0, "First?")])
+        generator.client = SimpleNamespace(
+            files=SimpleNamespace(
+                create=lambda **kwargs: SimpleNamespace(id="file-in"),
+                content=lambda file_id: SimpleNamespace(text=output),
+            ),
+            batches=SimpleNamespace(
+                create=lambda **kwargs: SimpleNamespace(id="batch-1", status="completed", output_file_id="file-out"),
+            ),
+        )
+        
+        results = generator.generate_questions_batch(["resume a", "resume b"], 1, ["Easy"], ["Behavioral"])
+        assert [r[0]["question"] for r in results] == ["First?", "Second?"]
+        assert len(QuestionGenerator._cache) == 2
+    
+    def test_stream_parser_yields_questions_as_they_complete(self):
+        """Test that questions are emitted per object regardless of chunk boundaries."""
+        questions = [
+            {"category": "Coding Test", "difficulty": "Hard", "question": 'Parse "{[" safely', "test_cases": ["f([]) == 0"]},
+            {"category": "Behavioral", "difficulty": "Easy", "question": "Tell me about yourself"},
+        ]
+        text = json.dumps({"questions": questions, "insights": {"questions": [{"category": "x"}]}})
+        
+        parser = _QuestionStreamParser()
+        emitted = []
+        for i in range(0, len(text), 3):
+            emitted.extend(parser.feed(text[i:i + 3]))
+            if len(emitted) == 1:
+                assert emitted[0] == questions[0]
+        assert emitted == questions
+    
+    def test_generate_many_runs_each_resume(self, generator):
+        """Test that concurrent generation returns questions in input order."""
+        async def create(**kwargs):
+            resume_text = kwargs["messages"][-1]["content"].rsplit("\n", 1)[-1]
+            return completion(json.dumps({"questions": [{"category": "Behavioral", "difficulty": "Easy", "question": resume_text}]}))
+        
+        generator.aclient = fake_client(create)
+        results = asyncio.run(generator.generate_many(["first", "second", "third"], 1, ["Easy"], ["Behavioral"], concurrency=2))
+        assert [r[0]["question"] for r in results] == ["first", "second", "third"]
+    
+    def test_agenerate_questions_splits_count_across_categories(self, generator):
+        """Test that each category gets its own request and the results are merged."""
+        prompts = []
+        
+        async def create(**kwargs):
+            prompt = kwargs["messages"][-1]["content"]
+            prompts.append(prompt)
+            category = "Behavioral" if "Behavioral" in prompt else "Technical Skills"
+            count = int(prompt.split("Generate exactly ", 1)[1].split()[0])
+            return completion(json.dumps({
+                "questions": [{"category": category, "difficulty": "Easy", "question": f"{category} {i}"} for i in range(count)],
+                "insights": {"technologies": [category]},
+            }))
+        
+        generator.aclient = fake_client(create)
+        result = asyncio.run(generator.agenerate_questions("resume", 5, ["Easy"], ["Technical Skills", "Behavioral"]))
+        assert [q["category"] for q in result["questions"]] == ["Technical Skills"] * 3 + ["Behavioral"] * 2
+        assert result["insights"] == {"technologies": ["Technical Skills"]}
+        assert sum("Only do task 2" in prompt for prompt in prompts) == 1
+    
+    def test_async_client_is_per_event_loop(self, generator):
+        """Test that a shared generator never reuses an async client across event loops, and closes each one."""
+        async def clients():
+            async with generator._async_client() as outer:
+                async with generator._async_client() as inner:
+                    assert not inner.is_closed()
+                assert not outer.is_closed()
+                return outer, inner
+        
+        first_a, first_b = asyncio.run(clients())
+        second_a, _ = asyncio.run(clients())
+        assert first_a is first_b
+        assert first_a is not second_a
+        assert first_a.is_closed() and second_a.is_closed()
+        assert generator._aclients == {}
+        assert first_a.max_retries == 0
+    
+    def test_rate_limited_calls_are_retried(self, monkeypatch, generator):
+        """Test that a 429 from OpenAI is retried with backoff instead of failing."""
+        monkeypatch.setattr(time, "sleep", lambda seconds: None)
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        attempts = []
+        
+        def create(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) < 3:
+                raise openai.RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+            return "response"
+        
+        generator.client = fake_client(create)
+        assert generator._create_completion(model="m") == "response"
+        assert len(attempts) == 3
+    
+    def test_async_calls_share_process_wide_limit(self, monkeypatch, generator):
+        """Test that async requests on different event loops count against one limit, and the SDK does not retry on its own."""
+        monkeypatch.setattr(QuestionGenerator, "_llm_slots", threading.BoundedSemaphore(1))
+        lock = threading.Lock()
+        active, peak = [0], [0]
+        
+        async def create(**kwargs):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return "response"
+        
+        generator.aclient = fake_client(create)
+        
+        async def calls():
+            return await asyncio.gather(*(generator._acreate_completion(model="m") for _ in range(2)))
+        
+        threads = [threading.Thread(target=asyncio.run, args=(calls(),)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert peak[0] == 1
+        assert QuestionGenerator._llm_slots.acquire(blocking=False)
+        assert generator.client.max_retries == 0
+    
+    def test_stream_holds_request_slot_until_consumed(self, monkeypatch, generator):
+        """Test that a streaming completion counts against the limit until it is closed."""
+        monkeypatch.setattr(QuestionGenerator, "_llm_slots", threading.BoundedSemaphore(1))
+        closed = []
+        
+        class FakeStream:
+            def __iter__(self):
+                return iter(["a", "b"])
+            
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc_info):
+                closed.append(True)
+        
+        generator.client = fake_client(lambda **kwargs: FakeStream())
+        stream = generator._stream_completion(model="m")
+        assert next(stream) == "a"
+        assert not QuestionGenerator._llm_slots.acquire(blocking=False)
+        stream.close()
+        assert closed == [True]
+        assert QuestionGenerator._llm_slots.acquire(blocking=False)
+    
+    def test_stream_returns_full_response(self, generator):
+        """Test that the question stream returns the full response text, from OpenAI and from the cache."""
+        content = '{"questions": [{"question": "Q1"}], "insights": {"technologies": ["SQL"]}}'
+        chunks = [content[:20], content[20:]]
+        
+        class FakeStream:
+            def __iter__(self):
+                for i, text in enumerate(chunks):
+                    finish_reason = "stop" if i == len(chunks) - 1 else None
+                    yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text), finish_reason=finish_reason)])
+            
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc_info):
+                pass
+        
+        calls = []
+        generator.client = fake_client(lambda **kwargs: calls.append(kwargs) or FakeStream())
+        for _ in range(2):
+            stream = generator.generate_questions_stream("resume", 1, ["Easy"], ["Behavioral"])
+            assert next(stream) == {"question": "Q1"}
+            with pytest.raises(StopIteration) as done:
+                next(stream)
+            assert done.value.value == content
+        assert len(calls) == 1
+        assert generator.parse_response(content)["insights"] == {"technologies": ["SQL"]}
+    
+    def test_concurrent_identical_requests_share_one_call(self, generator):
+        """Test that identical in-flight requests are coalesced into one OpenAI call."""
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+        
+        def create(**kwargs):
+            calls.append(kwargs)
+            started.set()
+            release.wait(5)
+            return completion('{"questions": []}')
+        
+        generator.client = fake_client(create)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(generator.generate_response("resume", 1, ["Easy"], ["Behavioral"])))
+                   for _ in range(3)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        assert len(calls) == 1
+        assert results == ['{"questions": []}'] * 3
+    
+    def test_cancelled_async_waiter_does_not_cancel_leader(self, generator):
+        """Test that cancelling an async waiter leaves the sync leader's request and result intact."""
+        started = threading.Event()
+        release = threading.Event()
+        
+        def create(**kwargs):
+            started.set()
+            release.wait(5)
+            return completion('{"questions": []}')
+        
+        generator.client = fake_client(create)
+        results, errors = [], []
+        
+        def lead():
+            try:
+                results.append(generator.generate_response("resume", 1, ["Easy"], ["Behavioral"]))
+            except Exception as e:
+                errors.append(e)
+        
+        leader = threading.Thread(target=lead)
+        leader.start()
+        started.wait(5)
+        
+        async def cancel_waiter():
+            task = asyncio.create_task(generator.generate_response_async("resume", 1, ["Easy"], ["Behavioral"]))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        
+        asyncio.run(cancel_waiter())
+        release.set()
+        leader.join(5)
+        
+        assert errors == []
+        assert results == ['{"questions": []}']
+        key = generator._cache_key("resume", 1, ["Easy"], ["Behavioral"])
+        assert generator._cache[key][1] == '{"questions": []}'
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Tests for utility helpers.
+"""
+
+import csv
+import io
+
+from interview_assistant.utils.helpers import format_questions_as_csv, format_questions_for_export
+
+
+QUESTIONS = [
+    {"category": "Behavioral", "difficulty": "Easy", "question": "Tell me about yourself"},
+    {"category": "Coding Test", "difficulty": "Hard", "question": "Reverse a list, in place", "test_cases": ["f([1, 2]) == [2, 1]"]},
+    {"category": "Behavioral", "difficulty": "Medium", "question": 'Describe a "hard" conflict'},
+]
+
+
+class TestExport:
+    """Test cases for the question export formats."""
+    
+    def test_format_questions_for_export(self):
+        """Test that questions are grouped by category in first-appearance order and numbered."""
+        assert format_questions_for_export(QUESTIONS) == (
+            "INTERVIEW QUESTIONS\n"
+            + "=" * 50 + "\n\n"
+            "BEHAVIORAL\n----------\n"
+            "1. Tell me about yourself\n   Difficulty: Easy\n\n"
+            '2. Describe a "hard" conflict\n   Difficulty: Medium\n\n'
+            "\n"
+            "CODING TEST\n-----------\n"
+            "1. Reverse a list, in place\n   Difficulty: Hard\n\n"
+            "\n"
+        )
+        assert format_questions_for_export([]) == "No questions available for export."
+    
+    def test_format_questions_as_csv(self):
+        """Test that the CSV has a column per field and round-trips quoted values."""
+        text = format_questions_as_csv(QUESTIONS)
+        assert text.splitlines()[0] == "category,difficulty,question,test_cases"
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert [row["question"] for row in rows] == [q["question"] for q in QUESTIONS]
+        assert rows[1]["test_cases"] == "['f([1, 2]) == [2, 1]']"
+        assert rows[0]["test_cases"] == ""
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Tests for the Streamlit app.
+"""
+
+import json
+import sys
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from interview_assistant.core.question_generator import QuestionGenerator
+from interview_assistant.main import summarize_questions
+
+# The package re-exports main(), which shadows the module of the same name
+app_module = sys.modules["interview_assistant.main"]
+
+
+QUESTIONS = [
+    {"category": "Technical", "difficulty": "Hard", "question": "Explain the GIL"},
+    {"category": "Behavioral", "difficulty": "Easy", "question": "Tell me about yourself"},
+    {"category": "Technical", "difficulty": "Medium", "question": "What is a decorator?"},
+]
+
+
+def render_questions_app():
+    """App script: show the questions stored in session state."""
+    import streamlit as st
+    from interview_assistant.main import display_questions, question_cards_html, summarize_questions
+
+    questions_by_category, _ = summarize_questions(st.session_state.questions)
+    st.session_state.cards = question_cards_html(questions_by_category)
+    st.session_state.cards_again = question_cards_html(questions_by_category)
+    display_questions(st.session_state.questions, questions_by_category)
+
+
+def run_questions_app(questions):
+    """Run render_questions_app with the given questions and return the AppTest."""
+    at = AppTest.from_function(render_questions_app)
+    at.session_state.questions = questions
+    return at.run()
+
+
+RESPONSE = {"questions": QUESTIONS, "insights": {"technologies": ["Python"]}, "ats_suggestions": ["Add metrics"]}
+
+
+class FakeGenerator(QuestionGenerator):
+    """QuestionGenerator whose requests are canned; a second request for the same click fails the test."""
+    
+    def __init__(self, llm_response):
+        super().__init__()
+        self.llm_response = llm_response
+        self.calls = []
+    
+    def generate_questions_stream(self, resume_text, question_count=10, difficulty_filter=["Easy"],
+                                  category_filter=["Technical Skills"]):
+        self.calls.append("stream")
+        yield from QUESTIONS[:1]
+        return self.llm_response
+    
+    async def agenerate_questions(self, resume_text, question_count=10, difficulty_filter=["Easy"],
+                                  category_filter=["Technical Skills"], on_questions=None):
+        self.calls.append("fan-out")
+        for category in category_filter:
+            on_questions([q for q in QUESTIONS if q["category"] == category])
+        return RESPONSE
+    
+    def generate_response(self, *args, **kwargs):
+        raise AssertionError("the response was requested a second time")
+
+
+def generate_questions_app():
+    """App script: click Generate for the categories in session state."""
+    import streamlit as st
+    from interview_assistant.main import generate_questions
+
+    generate_questions("resume", 3, ["Easy"], st.session_state.categories)
+
+
+@pytest.fixture
+def fake_generator(monkeypatch):
+    """Install a FakeGenerator (answering with the full RESPONSE) as the app's shared generator."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    generator = FakeGenerator(json.dumps(RESPONSE))
+    monkeypatch.setattr(app_module, "get_question_generator", lambda: generator)
+    return generator
+
+
+def run_generate_app(categories):
+    """Run generate_questions_app for the given categories and return the AppTest."""
+    at = AppTest.from_function(generate_questions_app)
+    at.session_state.categories = categories
+    return at.run()
+
+
+class TestGenerateQuestions:
+    """Test cases for the Generate Questions flow."""
+    
+    def test_single_category_streams_once(self, fake_generator):
+        """Test that a single category is streamed and its insights come from the streamed response."""
+        at = run_generate_app(["Technical"])
+        assert not at.exception and not at.error
+        assert fake_generator.calls == ["stream"]
+        assert at.session_state.questions == QUESTIONS
+        assert at.session_state.resume_insights == RESPONSE["insights"]
+        assert at.session_state.ats_suggestions == RESPONSE["ats_suggestions"]
+        assert at.session_state.hard_question_count == 1
+        assert at.success[0].value == "Generated 3 questions!"
+    
+    def test_truncated_stream_keeps_streamed_questions(self, fake_generator):
+        """Test that a truncated stream keeps the questions that arrived, without another request."""
+        fake_generator.llm_response = json.dumps(RESPONSE)[:40]
+        at = run_generate_app(["Technical"])
+        assert not at.exception
+        assert fake_generator.calls == ["stream"]
+        assert at.session_state.questions == QUESTIONS[:1]
+        assert at.session_state.resume_insights == {}
+    
+    def test_several_categories_fan_out(self, fake_generator):
+        """Test that several categories go through one concurrent fan-out and are summarized together."""
+        at = run_generate_app(["Technical", "Behavioral"])
+        assert not at.exception and not at.error
+        assert fake_generator.calls == ["fan-out"]
+        assert list(at.session_state.questions_by_category) == ["Technical", "Behavioral"]
+        assert at.session_state.resume_insights == RESPONSE["insights"]
+
+
+class TestQuestionsDisplay:
+    """Test cases for grouping and rendering generated questions."""
+    
+    def test_summarize_questions(self):
+        """Test that questions are grouped in first-seen order and hard ones counted."""
+        questions_by_category, hard_count = summarize_questions(QUESTIONS)
+        assert list(questions_by_category) == ["Technical", "Behavioral"]
+        assert questions_by_category["Technical"] == [QUESTIONS[0], QUESTIONS[2]]
+        assert hard_count == 1
+        assert summarize_questions([]) == ({}, 0)
+    
+    def test_question_cards_html(self):
+        """Test that each category gets a heading plus numbered cards, built once per question set."""
+        at = run_questions_app(QUESTIONS)
+        cards = at.session_state.cards
+        assert at.session_state.cards_again is cards
+        assert list(cards) == ["Technical", "Behavioral"]
+        assert cards["Technical"].startswith("### 📂 Technical\n")
+        assert "<strong>2.</strong> What is a decorator?" in cards["Technical"]
+        assert "difficulty-hard" in cards["Technical"]
+    
+    def test_display_questions_two_categories(self):
+        """Test that every category heading follows a blank line, closing the previous card's HTML block."""
+        at = run_questions_app(QUESTIONS)
+        assert not at.exception
+        body = next(md.value for md in at.markdown if "### 📂" in md.value)
+        lines = body.split("\n")
+        headings = [i for i, line in enumerate(lines) if line.startswith("### 📂")]
+        assert [lines[i] for i in headings] == ["### 📂 Technical", "### 📂 Behavioral"]
+        assert all(i == 0 or lines[i - 1] == "" for i in headings)
+    
+    def test_display_questions_coding_test(self):
+        """Test that Coding Test questions render as their own elements with test cases as code."""
+        coding = {"category": "Coding Test", "difficulty": "Hard", "question": "Reverse a list", "test_cases": ["f([1]) == [1]"]}
+        at = run_questions_app(QUESTIONS + [coding])
+        assert not at.exception
+        assert [sub.value for sub in at.subheader][0] == "📂 Coding Test"
+        assert [code.value for code in at.code] == ["f([1]) == [1]"]
\ No newline at end of file